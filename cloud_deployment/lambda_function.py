@@ -1,20 +1,65 @@
 
-import pickle
-import json
+import functools
 import os
+import orjson
 import numpy as np
-import pandas as pd
+from numba import njit
 
 # Global variable to cache the model (warm starts)
 model_dict = None
 
+# Feature buffer reused across warm invocations (allocated once the model is loaded)
+_BUF = None
+_CAT_VIEW = None
+
+# Feature column order (same as predict.py)
+CAT_COLS = (
+    "cap-shape", "cap-surface", "cap-color", "does-bruise-or-bleed",
+    "gill-attachment", "gill-spacing", "gill-color", "stem-surface",
+    "stem-color", "has-ring", "ring-type", "habitat", "season"
+)
+
+NUM_COLS = (
+    "cap-diameter", "stem-height", "stem-width", "spore_print_color_present"
+)
+
+# Numerical features that may be omitted from the request
+NUM_DEFAULTS = {"spore_print_color_present": 0}
+
+@njit(cache=True)
+def score(feature, threshold, left, right, value, X, init_logit):
+    """Raw log-odds for each row of quantized int16 inputs X (same as predict.py)"""
+    n_samples = X.shape[0]
+    n_trees = feature.shape[0]
+    raw = np.empty(n_samples)
+
+    for i in range(n_samples):
+        total = 0.0
+        for t in range(n_trees):
+            node = 0
+            while left[t, node] != -1:
+                go_left = X[i, feature[t, node]] <= threshold[t, node]
+                node = left[t, node] if go_left else right[t, node]
+            total += value[t, node]
+        raw[i] = init_logit + total
+
+    return raw
+
+@njit(cache=True)
+def onehot(codes, offsets, out):
+    """Set the one-hot slot of each category code (-1 = unknown) in a zeroed out"""
+    for r in range(codes.shape[0]):
+        for i in range(codes.shape[1]):
+            if codes[r, i] >= 0:
+                out[r, offsets[i] + codes[r, i]] = 1
+
 def load_model():
-    """Load trained model and encoders"""
-    global model_dict
+    """Load exported model arrays (no pickle or sklearn needed)"""
+    global model_dict, _BUF, _CAT_VIEW
     
     # In Lambda container, we'll put the model in the standard location
     # The Dockerfile will copy models/ to ${LAMBDA_TASK_ROOT}/models/
-    model_path = "models/model.pkl"
+    model_path = "models/model.npz"
 
     if model_dict is not None:
         return True
@@ -24,83 +69,105 @@ def load_model():
         return False
 
     try:
-        with open(model_path, "rb") as f:
-            model_dict = pickle.load(f)
+        with np.load(model_path) as arrays:
+            model_dict = {key: arrays[key] for key in arrays.files}
+        
+        # Rebuild per-column {category: local index} lookups from the flat vocabulary
+        offsets = model_dict["offsets"]
+        cat_vocab = model_dict["cat_vocab"].tolist()
+        model_dict["cat_maps"] = [
+            {cat: idx for idx, cat in enumerate(cat_vocab[start:end])}
+            for start, end in zip(offsets[:-1], offsets[1:])
+        ]
+        
+        # A Lambda container serves one request at a time, so a single buffer is safe
+        cat_dim = int(offsets[-1])
+        _BUF = np.zeros((1, cat_dim + len(NUM_COLS)), dtype=np.int16)
+        _CAT_VIEW = _BUF[:, :cat_dim]
+        
+        # Compile (or load from NUMBA_CACHE_DIR) the kernels and touch the tree
+        # arrays now, so the first invocation doesn't pay for it
+        onehot(np.full((1, len(CAT_COLS)), -1, dtype=np.int16), offsets, _BUF)
+        score(
+            model_dict["feature"], model_dict["threshold"], model_dict["left"],
+            model_dict["right"], model_dict["value"], _BUF,
+            float(model_dict["init_logit"])
+        )
         print(f"✅ Model loaded successfully from {model_path}")
         return True
     except Exception as e:
         print(f"❌ Error loading model: {e}")
         return False
 
+@functools.lru_cache(maxsize=4096)
+def _score_cached(key):
+    """(class name, confidence) for one input, cached per container across warm starts"""
+    # Extract model components
+    classes = model_dict["classes"]
+    cat_maps = model_dict["cat_maps"]
+    offsets = model_dict["offsets"]
+    num_edges = model_dict["num_edges"]
+    cat_dim = int(offsets[-1])
+    
+    # Encode in place into the reused buffer (one-hot slots, then numerical
+    # values quantized to the trees' bin codes)
+    codes = np.array(
+        [[cat_maps[i].get(key[i], -1) for i in range(len(CAT_COLS))]], dtype=np.int16
+    )
+    _CAT_VIEW.fill(0)
+    onehot(codes, offsets, _BUF)
+    for j in range(len(NUM_COLS)):
+        value = key[len(CAT_COLS) + j]
+        # The exported trees have no branch for missing values (NaN would go right everywhere)
+        if not np.isfinite(value):
+            raise ValueError("Numerical features must be finite numbers")
+        _BUF[0, cat_dim + j] = np.searchsorted(num_edges[j], value, side="left")
+    
+    # Make prediction
+    raw = score(
+        model_dict["feature"], model_dict["threshold"], model_dict["left"],
+        model_dict["right"], model_dict["value"], _BUF,
+        float(model_dict["init_logit"])
+    )[0]
+    proba_positive = 1.0 / (1.0 + np.exp(-raw))
+    prediction_proba = np.array([1.0 - proba_positive, proba_positive])
+    prediction_class = int(prediction_proba.argmax())
+    
+    # Map prediction to class name
+    predicted_class_name = str(classes[prediction_class])
+    confidence = float(prediction_proba[prediction_class])
+    
+    return predicted_class_name, confidence
+
+# Load during Lambda init (cold start) rather than inside the first invocation.
+# load_model() logs and returns False on failure, so the container still starts
+# and invocations report the error below.
+load_model()
+
 def lambda_handler(event, context):
     """
     AWS Lambda Handler
     """
-    global model_dict
-    
-    # Ensure model is loaded
     if model_dict is None:
-        success = load_model()
-        if not success:
-             return {
-                'statusCode': 500,
-                'body': json.dumps({'error': 'Failed to load model'})
-            }
+        return {
+            'statusCode': 500,
+            'body': orjson.dumps({'error': 'Failed to load model'}).decode()
+        }
 
     try:
         # Parse logic: Handle both direct invocation and API Gateway proxy integration
         body = event
         if 'body' in event:
             if isinstance(event['body'], str):
-                body = json.loads(event['body'])
+                body = orjson.loads(event['body'])
             else:
                 body = event['body']
         
-        # Extract model components
-        model = model_dict["model"]
-        ohe = model_dict["ohe"]
-        le_target = model_dict["le_target"]
-        
-        # Feature processing logic (copied from predict.py)
-        # We need to ensure the input body has the expected keys
-        # We'll use the same list of columns as predict.py
-        
-        categorical_cols = [
-            "cap-shape", "cap-surface", "cap-color", "does-bruise-or-bleed",
-            "gill-attachment", "gill-spacing", "gill-color", "stem-surface",
-            "stem-color", "has-ring", "ring-type", "habitat", "season"
-        ]
-
-        numerical_cols = [
-            "cap-diameter", "stem-height", "stem-width", "spore_print_color_present"
-        ]
-        
-        # Prepare input data
-        input_data = {}
-        for col in categorical_cols:
-            input_data[col] = [body.get(col)]
-
-        for col in numerical_cols:
-            if col == "spore_print_color_present":
-                input_data[col] = [body.get(col, 0)] # Default to 0
-            else:
-                input_data[col] = [body.get(col)]
-                
-        df_input = pd.DataFrame(input_data)
-        
-        # Apply OneHotEncoding
-        X_cat_encoded = ohe.transform(df_input[categorical_cols])
-        
-        # Combine with numerical features
-        X_encoded = np.hstack([X_cat_encoded, df_input[numerical_cols].values])
-        
-        # Make prediction
-        prediction_proba = model.predict_proba(X_encoded)[0]
-        prediction_class = model.predict(X_encoded)[0]
-        
-        # Map prediction to class name
-        predicted_class_name = le_target.inverse_transform([prediction_class])[0]
-        confidence = float(prediction_proba[prediction_class])
+        # Key on the exact input values; repeated requests skip encoding and scoring
+        key = tuple(body.get(col) for col in CAT_COLS) + tuple(
+            float(body.get(col, NUM_DEFAULTS.get(col))) for col in NUM_COLS
+        )
+        predicted_class_name, confidence = _score_cached(key)
         
         prediction_label = "edible" if predicted_class_name == "e" else "poisonous"
         
@@ -113,12 +180,12 @@ def lambda_handler(event, context):
         return {
             'statusCode': 200,
             'headers': {'Content-Type': 'application/json'},
-            'body': json.dumps(response)
+            'body': orjson.dumps(response).decode()
         }
 
     except Exception as e:
         print(f"Error: {str(e)}")
         return {
             'statusCode': 400,
-            'body': json.dumps({'error': str(e)})
+            'body': orjson.dumps({'error': str(e)}).decode()
         }
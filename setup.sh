@@ -33,7 +33,7 @@ echo "✅ Dependencies installed and virtual environment created"
 
 # Step 4: Train model
 echo -e "${BLUE}📌 Step 4: Training model...${NC}"
-if [ ! -f "models/model.pkl" ]; then
+if [ ! -f "models/model.npz" ]; then
     uv run python train.py
     echo "✅ Model trained and saved"
 else
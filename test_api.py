@@ -5,8 +5,16 @@ Tests both local and deployed endpoints
 
 import requests
 import json
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
 from typing import Optional
 
+# Keep-alive session shared by all tests; the pool fits MAX_WORKERS parallel calls
+MAX_WORKERS = 16
+session = requests.Session()
+session.mount("http://", HTTPAdapter(pool_maxsize=MAX_WORKERS))
+session.mount("https://", HTTPAdapter(pool_maxsize=MAX_WORKERS))
+
 # Example mushroom data
 SAMPLE_MUSHROOM = {
     "cap-diameter": 8.5,
@@ -51,7 +59,7 @@ def test_health_check(base_url: str) -> bool:
     """Test health check endpoint"""
     print("\n🏥 Testing health check...")
     try:
-        response = requests.get(f"{base_url}/health", timeout=5)
+        response = session.get(f"{base_url}/health", timeout=5)
         if response.status_code == 200:
             print(f"✅ Health check passed: {response.json()}")
             return True
@@ -65,9 +73,10 @@ def test_health_check(base_url: str) -> bool:
 
 def test_prediction(base_url: str, mushroom_data: dict, expected_class: Optional[str] = None) -> bool:
     """Test prediction endpoint"""
-    print(f"\n🍄 Testing prediction...")
+    # Output is written in a single call so parallel runs don't interleave
+    lines = ["\n🍄 Testing prediction..."]
     try:
-        response = requests.post(
+        response = session.post(
             f"{base_url}/predict",
             json=mushroom_data,
             timeout=10,
@@ -75,28 +84,30 @@ def test_prediction(base_url: str, mushroom_data: dict, expected_class: Optional
 
         if response.status_code == 200:
             result = response.json()
-            print(f"✅ Prediction successful!")
-            print(f"   Prediction: {result['prediction']}")
-            print(f"   Probability: {result['probability']}")
-            print(f"   Confidence: {result['confidence_percent']}")
+            lines.append("✅ Prediction successful!")
+            lines.append(f"   Prediction: {result['prediction']}")
+            lines.append(f"   Probability: {result['probability']}")
+            lines.append(f"   Confidence: {result['confidence_percent']}")
 
             if expected_class and result["prediction"] != expected_class:
-                print(f"⚠️  Expected {expected_class}, got {result['prediction']}")
+                lines.append(f"⚠️  Expected {expected_class}, got {result['prediction']}")
             return True
         else:
-            print(f"❌ Prediction failed: {response.status_code}")
-            print(f"   Response: {response.text}")
+            lines.append(f"❌ Prediction failed: {response.status_code}")
+            lines.append(f"   Response: {response.text}")
             return False
     except Exception as e:
-        print(f"❌ Prediction error: {e}")
+        lines.append(f"❌ Prediction error: {e}")
         return False
+    finally:
+        print("\n".join(lines) + "\n", end="")
 
 
 def test_batch_prediction(base_url: str, mushroom_list: list) -> bool:
     """Test batch prediction endpoint"""
     print(f"\n📦 Testing batch prediction ({len(mushroom_list)} samples)...")
     try:
-        response = requests.post(
+        response = session.post(
             f"{base_url}/batch_predict",
             json=mushroom_list,
             timeout=15,
@@ -122,9 +133,9 @@ def test_documentation(base_url: str) -> bool:
     print(f"\n📚 Testing documentation endpoints...")
     try:
         # Test Swagger UI
-        response_swagger = requests.get(f"{base_url}/docs", timeout=5)
+        response_swagger = session.get(f"{base_url}/docs", timeout=5)
         # Test ReDoc
-        response_redoc = requests.get(f"{base_url}/redoc", timeout=5)
+        response_redoc = session.get(f"{base_url}/redoc", timeout=5)
 
         if response_swagger.status_code == 200 and response_redoc.status_code == 200:
             print("✅ Documentation endpoints available")
@@ -151,11 +162,14 @@ def run_full_test_suite(base_url: str = "http://localhost:8000"):
     # Test 1: Health check
     results.append(("Health Check", test_health_check(base_url)))
 
-    # Test 2: Single prediction (edible)
-    results.append(("Single Prediction", test_prediction(base_url, SAMPLE_MUSHROOM)))
-
-    # Test 3: Single prediction (poisonous)
-    results.append(("Poisonous Prediction", test_prediction(base_url, POISONOUS_MUSHROOM)))
+    # Tests 2-3: Single predictions (edible, poisonous), sent concurrently
+    single_tests = [
+        ("Single Prediction", SAMPLE_MUSHROOM),
+        ("Poisonous Prediction", POISONOUS_MUSHROOM),
+    ]
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        passed = executor.map(lambda m: test_prediction(base_url, m), [m for _, m in single_tests])
+        results.extend(zip([name for name, _ in single_tests], passed))
 
     # Test 4: Batch prediction
     results.append(("Batch Prediction", test_batch_prediction(base_url, [SAMPLE_MUSHROOM, POISONOUS_MUSHROOM])))
@@ -0,0 +1,11 @@
+import os
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "cloud_deployment"))
+
+# Model paths are relative to the project root, and the Lambda module loads
+# its model at import time
+os.chdir(ROOT)
@@ -0,0 +1,158 @@
+"""
+Tests for the /predict micro-batcher and its result cache
+"""
+
+import asyncio
+import time
+
+import httpx
+import pytest
+
+import predict
+from test_api import SAMPLE_MUSHROOM
+
+
+@pytest.fixture(scope="module", autouse=True)
+def loaded_model():
+    assert predict.load_model()
+
+
+@pytest.fixture(autouse=True)
+def batches(monkeypatch):
+    """Sizes of the batches passed to score_batch, with a fresh result cache"""
+    sizes = []
+    score_batch = predict.score_batch
+
+    def recording_score_batch(feature_dicts):
+        sizes.append(len(feature_dicts))
+        return score_batch(feature_dicts)
+
+    monkeypatch.setattr(predict, "score_batch", recording_score_batch)
+    monkeypatch.setattr(predict, "_results", {})
+    return sizes
+
+
+def samples(n):
+    """n distinct valid requests"""
+    return [{**SAMPLE_MUSHROOM, "cap-diameter": 1.0 + i} for i in range(n)]
+
+
+async def score_queued(feature_dicts):
+    """Queue every request before the batcher starts, then collect the results"""
+    queue = asyncio.Queue()
+    futures = []
+    for feature_dict in feature_dicts:
+        future = asyncio.get_running_loop().create_future()
+        await queue.put((predict.cache_key(feature_dict), future))
+        futures.append(future)
+
+    task = asyncio.create_task(predict.batcher(queue))
+    try:
+        return await asyncio.gather(*futures)
+    finally:
+        task.cancel()
+
+
+def test_queued_requests_are_scored_in_one_batch(batches):
+    feature_dicts = samples(10)
+
+    results = asyncio.run(score_queued(feature_dicts))
+
+    assert batches == [10]
+    assert results == predict.score_batch(feature_dicts)
+
+
+def test_batches_are_capped_at_max_size(batches):
+    asyncio.run(score_queued(samples(2 * predict.BATCH_MAX_SIZE + 1)))
+
+    assert batches == [predict.BATCH_MAX_SIZE, predict.BATCH_MAX_SIZE, 1]
+
+
+def test_lone_requests_are_not_delayed(batches):
+    """Sequential requests are each dispatched at once, without waiting for company"""
+
+    async def score_sequentially(feature_dicts):
+        queue = asyncio.Queue()
+        task = asyncio.create_task(predict.batcher(queue))
+        try:
+            for feature_dict in feature_dicts:
+                future = asyncio.get_running_loop().create_future()
+                await queue.put((predict.cache_key(feature_dict), future))
+                await future
+        finally:
+            task.cancel()
+
+    start = time.perf_counter()
+    asyncio.run(score_sequentially(samples(20)))
+    elapsed = time.perf_counter() - start
+
+    assert batches == [1] * 20
+    # Scoring takes well under 1 ms; a per-batch wait would add up quickly
+    assert elapsed < 0.1
+
+
+def test_concurrent_predict_calls_share_a_batch(monkeypatch, batches):
+    feature_dicts = samples(16)
+
+    async def post_concurrently():
+        queue = asyncio.Queue()
+        monkeypatch.setattr(predict, "_batch_queue", queue)
+
+        transport = httpx.ASGITransport(app=predict.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            responses = asyncio.gather(
+                *(client.post("/predict", json=feature_dict) for feature_dict in feature_dicts)
+            )
+            # Start scoring only once every request is waiting in the queue
+            while queue.qsize() < len(feature_dicts):
+                await asyncio.sleep(0)
+            task = asyncio.create_task(predict.batcher(queue))
+            try:
+                return await responses
+            finally:
+                task.cancel()
+
+    responses = asyncio.run(post_concurrently())
+
+    assert batches == [16]
+    expected = [
+        predict.make_response(name, confidence).model_dump()
+        for name, confidence in predict.score_batch(feature_dicts)
+    ]
+    assert [response.json() for response in responses] == expected
+
+
+def test_repeated_predict_is_served_from_cache(monkeypatch, batches):
+    async def post_twice():
+        queue = asyncio.Queue()
+        monkeypatch.setattr(predict, "_batch_queue", queue)
+        task = asyncio.create_task(predict.batcher(queue))
+
+        transport = httpx.ASGITransport(app=predict.app)
+        try:
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                first = await client.post("/predict", json=SAMPLE_MUSHROOM)
+                second = await client.post("/predict", json=SAMPLE_MUSHROOM)
+        finally:
+            task.cancel()
+        return first, second
+
+    first, second = asyncio.run(post_twice())
+
+    assert batches == [1]
+    assert first.status_code == second.status_code == 200
+    assert first.json() == second.json()
+
+
+def test_result_cache_evicts_least_recently_used(monkeypatch):
+    monkeypatch.setattr(predict, "RESULTS_MAXSIZE", 2)
+
+    predict.remember_result("a", ("e", 0.9))
+    predict.remember_result("b", ("p", 0.8))
+    # Reading "a" makes "b" the least recently used entry
+    assert predict.cached_result("a") == ("e", 0.9)
+    predict.remember_result("c", ("p", 0.7))
+
+    assert predict.cached_result("b") is None
+    assert predict.cached_result("a") == ("e", 0.9)
+    assert predict.cached_result("c") == ("p", 0.7)
@@ -0,0 +1,129 @@
+"""
+Equivalence tests for the exported-tree scorer
+Checks predict.py and the Lambda handler against the trained sklearn model
+"""
+
+import json
+import pickle
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.model_selection import train_test_split
+
+import train
+import predict
+import lambda_function
+
+
+@pytest.fixture(scope="module")
+def saved():
+    """Trained sklearn model and preprocessing from models/model.pkl"""
+    with open("models/model.pkl", "rb") as f:
+        return pickle.load(f)
+
+
+@pytest.fixture(scope="module")
+def held_out():
+    """Raw feature dicts of the test split used by train.py"""
+    df = train.load_and_prepare_data("data/mushroom.csv")
+    _, test_idx = train_test_split(
+        np.arange(len(df)), test_size=0.2, random_state=42, stratify=df["class"]
+    )
+    return df.iloc[test_idx].drop(columns="class").to_dict("records")
+
+
+@pytest.fixture(scope="module", autouse=True)
+def loaded_model():
+    """Load the exported arrays into predict.py"""
+    assert predict.load_model()
+    assert lambda_function.model_dict is not None
+
+
+def sklearn_predict(saved, feature_dicts):
+    """(class names, confidences) from the sklearn model for raw feature dicts"""
+    ohe = saved["ohe"]
+    num_cols = list(saved["feature_names"][len(ohe.get_feature_names_out()):])
+
+    rows = pd.DataFrame(feature_dicts)
+    X = np.hstack([ohe.transform(rows[ohe.feature_names_in_]), rows[num_cols].to_numpy()])
+    proba = saved["model"].predict_proba(X)
+
+    names = saved["le_target"].inverse_transform(saved["model"].predict(X))
+    return names, proba.max(axis=1)
+
+
+def lambda_key(feature_dict):
+    """Cache key built the same way as lambda_handler"""
+    return tuple(feature_dict.get(col) for col in lambda_function.CAT_COLS) + tuple(
+        float(feature_dict.get(col, lambda_function.NUM_DEFAULTS.get(col)))
+        for col in lambda_function.NUM_COLS
+    )
+
+
+def assert_matches_sklearn(saved, feature_dicts):
+    """Both serving paths agree with the sklearn model on every sample"""
+    names, confidences = sklearn_predict(saved, feature_dicts)
+
+    results = predict.score_batch(feature_dicts)
+    assert [name for name, _ in results] == names.tolist()
+    np.testing.assert_allclose([conf for _, conf in results], confidences, rtol=0, atol=1e-9)
+
+    results = [lambda_function._score_cached(lambda_key(d)) for d in feature_dicts]
+    assert [name for name, _ in results] == names.tolist()
+    np.testing.assert_allclose([conf for _, conf in results], confidences, rtol=0, atol=1e-9)
+
+
+def test_held_out_rows_match_sklearn(saved, held_out):
+    assert_matches_sklearn(saved, held_out)
+
+
+def test_reused_buffer_matches_sklearn(saved, held_out):
+    """Micro-batch sized inputs share one buffer; stale rows must not leak between batches"""
+    first = predict.encode_batch(held_out[:predict.BATCH_MAX_SIZE])
+    second = predict.encode_batch(held_out[:3])
+    assert np.shares_memory(first, second)
+
+    for size in (predict.BATCH_MAX_SIZE, 7, 1, 33):
+        for start in range(0, 4 * size, size):
+            assert_matches_sklearn(saved, held_out[start:start + size])
+
+
+@pytest.mark.parametrize("col", predict.NUM_COLS)
+def test_values_on_split_edges_match_sklearn(saved, held_out, col):
+    """Values exactly on a split threshold go left; one ulp above goes right"""
+    j = predict.NUM_COLS.index(col)
+    edges = predict.model_dict["trees"]["num_edges"][j]
+    edges = edges[np.isfinite(edges)]
+
+    feature_dicts = []
+    for i, edge in enumerate(edges):
+        for value in (np.nextafter(edge, -np.inf), edge, np.nextafter(edge, np.inf)):
+            feature_dicts.append({**held_out[i % len(held_out)], col: float(value)})
+
+    assert_matches_sklearn(saved, feature_dicts)
+
+
+def test_unknown_categories_match_sklearn(saved, held_out):
+    """Unseen categories encode to all-zero one-hot slots, as with handle_unknown='ignore'"""
+    feature_dicts = [
+        {**feature_dict, col: "unseen"}
+        for feature_dict in held_out[:50]
+        for col in predict.CAT_COLS
+    ]
+    assert_matches_sklearn(saved, feature_dicts)
+
+
+@pytest.mark.parametrize("value", ["nan", "inf", "-inf", float("nan")])
+@pytest.mark.parametrize("col", ["cap-diameter", "stem-height"])
+def test_non_finite_values_are_rejected(held_out, col, value):
+    """The exported trees can't route missing values, so they must not reach the scorer"""
+    feature_dict = {**held_out[0], col: value}
+
+    with pytest.raises(ValueError):
+        predict.cache_key(feature_dict)
+    with pytest.raises(ValueError):
+        predict.score_batch([held_out[1], feature_dict])
+
+    event = {"body": json.dumps(feature_dict)}
+    assert lambda_function.lambda_handler(event, None)["statusCode"] == 400
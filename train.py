@@ -8,7 +8,7 @@ import pandas as pd
 import numpy as np
 from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import LabelEncoder, OneHotEncoder
-from sklearn.ensemble import GradientBoostingClassifier
+from sklearn.ensemble import HistGradientBoostingClassifier
 from sklearn.metrics import (
     accuracy_score,
     precision_score,
@@ -17,9 +17,6 @@ from sklearn.metrics import (
     confusion_matrix,
     classification_report,
 )
-import warnings
-
-warnings.filterwarnings("ignore")
 
 
 def load_and_prepare_data(filepath="data/mushroom.csv"):
@@ -67,12 +64,12 @@ def load_and_prepare_data(filepath="data/mushroom.csv"):
         print(f"Dropping columns with >80% nulls: {cols_to_drop}")
         df_clean = df_clean.drop(cols_to_drop, axis=1)
 
-    # Impute remaining nulls
-    for col in cols_to_impute:
-        if df_clean[col].dtype == "object":
-            df_clean[col].fillna("Unknown", inplace=True)
-        else:
-            df_clean[col].fillna(df_clean[col].median(), inplace=True)
+    # Impute remaining nulls in a single pass
+    fill_map = {
+        col: "Unknown" if df_clean[col].dtype == "object" else df_clean[col].median()
+        for col in cols_to_impute
+    }
+    df_clean = df_clean.fillna(fill_map)
 
     print(f"Final shape after cleaning: {df_clean.shape}")
     print(f"Remaining nulls: {df_clean.isnull().sum().sum()}")
@@ -84,9 +81,9 @@ def prepare_features_and_target(df):
     """Prepare features and target using OneHotEncoding for categorical variables"""
     print("\nPreparing features with OneHotEncoding...")
 
-    # Separate features and target
-    y = df["class"].copy()
-    X = df.drop("class", axis=1).copy()
+    # Separate features and target (no copies; only read from here on)
+    y = df["class"].to_numpy()
+    X = df.drop(columns="class")
 
     # Identify categorical and numerical columns
     categorical_cols = X.select_dtypes(include=["object"]).columns.tolist()
@@ -115,22 +112,25 @@ def prepare_features_and_target(df):
     print(f"Final feature matrix shape: {X_encoded.shape}")
     print(f"  {len(cat_feature_names)} encoded categorical + {len(numerical_cols)} numerical = {len(feature_names)} total features")
 
-    # Create DataFrame with encoded features
-    X_processed = pd.DataFrame(X_encoded, columns=feature_names)
-
-    return X_processed, y_encoded, ohe, le_target, feature_names
+    # Plain ndarray straight into train_test_split; feature_names are saved separately
+    return X_encoded, y_encoded, ohe, le_target, feature_names
 
 
 def train_model(X_train, y_train):
-    """Train Gradient Boosting model with optimal hyperparameters from GridSearchCV"""
-    print("\nTraining Gradient Boosting Classifier...")
-    print("Optimal hyperparameters from 5-fold CV with F1 scoring:")
-
-    model = GradientBoostingClassifier(
+    """Train histogram-based Gradient Boosting model"""
+    print("\nTraining Histogram Gradient Boosting Classifier...")
+    # Learning rate and depth come from the GradientBoostingClassifier grid
+    # search; at its 100 iterations this model still misses poisonous
+    # mushrooms, so it gets more rounds (early stopping caps the count)
+    print("Hyperparameters (learning rate/depth from the earlier 5-fold CV grid search):")
+
+    model = HistGradientBoostingClassifier(
         learning_rate=0.1,
         max_depth=7,
-        n_estimators=100,
+        max_leaf_nodes=None,
+        max_iter=500,
         random_state=42,
+        early_stopping=True,
         n_iter_no_change=10,
         validation_fraction=0.1,
     )
@@ -139,7 +139,7 @@ def train_model(X_train, y_train):
     print("✓ Model training completed")
     print(f"  Learning Rate: 0.1")
     print(f"  Max Depth: 7")
-    print(f"  Number of Estimators: 100")
+    print(f"  Max Iterations: 500 (early stopping used {model.n_iter_})")
 
     return model
 
@@ -168,16 +168,102 @@ def evaluate_model(model, X_test, y_test, le_target):
     cm = confusion_matrix(y_test, y_pred)
     print(cm)
 
+    # The costly mistake for an edibility classifier: poisonous called edible
+    edible, poisonous = le_target.transform(["e", "p"])
+    print(f"Poisonous predicted edible: {cm[poisonous, edible]}")
+
     print("\nClassification Report:")
     print(classification_report(y_test, y_pred, target_names=le_target.classes_))
 
-    # Feature importance
-    feature_importance = model.feature_importances_
-    return accuracy, precision, recall, f1, feature_importance
+    return accuracy, precision, recall, f1
+
+
+def export_trees(model, n_numerical):
+    """Export boosted trees into padded int16 structure-of-arrays for the inference scorer"""
+    # sklearn has no public tree export for HistGradientBoosting; binary
+    # classification grows one predictor per iteration
+    trees = [predictors[0].nodes for predictors in model._predictors]
+    n_trees = len(trees)
+    max_nodes = max(len(nodes) for nodes in trees)
+    n_features = model.n_features_in_
+
+    if any(nodes["is_categorical"].any() for nodes in trees):
+        raise ValueError("Native categorical splits are not supported by the exported scorer")
+
+    # Quantize thresholds: each feature's split thresholds become sorted bin
+    # edges, and a threshold is replaced by its index among those edges.
+    # An input quantized to "number of edges below it" then satisfies
+    # code <= index exactly when value <= threshold, so splits are unchanged.
+    split_thresholds = [[] for _ in range(n_features)]
+    for nodes in trees:
+        internal = nodes["is_leaf"] == 0
+        for f, thr in zip(nodes["feature_idx"][internal], nodes["num_threshold"][internal]):
+            split_thresholds[f].append(thr)
+    edges = [np.unique(thresholds) for thresholds in split_thresholds]
+
+    # Unused slots are padded with -1 (leaves already use -1 for children)
+    feature = np.full((n_trees, max_nodes), -1, dtype=np.int16)
+    threshold = np.full((n_trees, max_nodes), -1, dtype=np.int16)
+    left = np.full((n_trees, max_nodes), -1, dtype=np.int16)
+    right = np.full((n_trees, max_nodes), -1, dtype=np.int16)
+    value = np.zeros((n_trees, max_nodes), dtype=np.float64)
+
+    for i, nodes in enumerate(trees):
+        n_nodes = len(nodes)
+        internal = nodes["is_leaf"] == 0
+        feature[i, :n_nodes] = np.where(internal, nodes["feature_idx"], -1)
+        threshold[i, :n_nodes][internal] = [
+            np.searchsorted(edges[f], thr)
+            for f, thr in zip(nodes["feature_idx"][internal], nodes["num_threshold"][internal])
+        ]
+        left[i, :n_nodes] = np.where(internal, nodes["left"], -1)
+        right[i, :n_nodes] = np.where(internal, nodes["right"], -1)
+        value[i, :n_nodes] = nodes["value"]
+
+    # One-hot features only ever split at 0.5, so their 0/1 values are already
+    # valid codes; numerical features keep their edges (padded with +inf) so
+    # inputs can be quantized at request time
+    num_edges = edges[n_features - n_numerical:]
+    max_edges = max(len(e) for e in num_edges)
+    num_edges_padded = np.full((n_numerical, max_edges), np.inf)
+    for j, e in enumerate(num_edges):
+        num_edges_padded[j, :len(e)] = e
+
+    # Baseline raw prediction is the log-odds of the training class prior.
+    # Leaf values already include the learning rate (applied as shrinkage
+    # while growing), so the scorer just adds them up.
+    init_logit = float(model._baseline_prediction.ravel()[0])
+
+    return {
+        "feature": feature,
+        "threshold": threshold,
+        "left": left,
+        "right": right,
+        "value": value,
+        "num_edges": num_edges_padded,
+        "init_logit": init_logit,
+    }
+
+
+def export_encoder(ohe):
+    """Export OneHotEncoder vocabularies as flat arrays for the inference encoder"""
+    # All categories concatenated column by column, plus each column's start
+    # offset in the encoded vector (the last offset is the one-hot width)
+    cat_vocab = np.concatenate(ohe.categories_).astype(str)
+    offsets = np.cumsum([0] + [len(cats) for cats in ohe.categories_])
 
+    return {"cat_vocab": cat_vocab, "offsets": offsets}
 
-def save_model(model, ohe, le_target, feature_names, filepath="models/model.pkl"):
-    """Save trained model and encoders for inference"""
+
+def save_model(
+    model,
+    ohe,
+    le_target,
+    feature_names,
+    filepath="models/model.pkl",
+    arrays_path="models/model.npz",
+):
+    """Save trained model and encoders, plus the flat arrays used for inference"""
     import os
 
     os.makedirs(os.path.dirname(filepath), exist_ok=True)
@@ -192,11 +278,18 @@ def save_model(model, ohe, le_target, feature_names, filepath="models/model.pkl"
     with open(filepath, "wb") as f:
         pickle.dump(model_dict, f)
 
+    # The prediction services load only these plain arrays (no pickle, no sklearn)
+    encoder = export_encoder(ohe)
+    n_numerical = len(feature_names) - int(encoder["offsets"][-1])
+    trees = export_trees(model, n_numerical)
+    np.savez(arrays_path, **trees, **encoder, classes=le_target.classes_.astype(str))
+
     print(f"\n✅ Model saved to {filepath}")
-    print(f"   - Model: Gradient Boosting Classifier")
+    print(f"   - Model: Histogram Gradient Boosting Classifier")
     print(f"   - OneHotEncoder: For categorical feature encoding")
     print(f"   - Target Encoder: {le_target.classes_}")
     print(f"   - Feature count: {len(feature_names)}")
+    print(f"✅ Inference arrays saved to {arrays_path} ({trees['feature'].shape[0]} trees)")
 
 
 def main():
@@ -223,7 +316,7 @@ def main():
     model = train_model(X_train, y_train)
 
     # Evaluate model
-    accuracy, precision, recall, f1, feature_importance = evaluate_model(
+    accuracy, precision, recall, f1 = evaluate_model(
         model, X_test, y_test, le_target
     )
 